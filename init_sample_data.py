@@ -6,6 +6,7 @@ Użycie: python init_sample_data.py
 
 import os
 import sys
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 # Add project root to path
@@ -48,14 +49,12 @@ def create_sample_data():
             }
         ]
         
-        shops = []
-        for shop_data in shops_data:
-            shop = models.Shop(**shop_data)
-            db.add(shop)
-            shops.append(shop)
-            print(f"  ✓ {shop_data['name']}")
-        
-        db.commit()
+        shop_ids = db.execute(
+            insert(models.Shop).returning(
+                models.Shop.id, sort_by_parameter_order=True),
+            shops_data
+        ).scalars().all()
+        print("\n".join("  ✓ " + shop_data["name"] for shop_data in shops_data))
         
         # 2. Dodaj produkty
         print("\n🐱 Tworzenie produktów...")
@@ -87,14 +86,15 @@ def create_sample_data():
             }
         ]
         
-        products = []
-        for product_data in products_data:
-            product = models.Product(**product_data)
-            db.add(product)
-            products.append(product)
-            print(f"  ✓ {product_data['brand']} {product_data['name']}")
-        
-        db.commit()
+        product_ids = db.execute(
+            insert(models.Product).returning(
+                models.Product.id, sort_by_parameter_order=True),
+            products_data
+        ).scalars().all()
+        print("\n".join(
+            "  ✓ " + product_data["brand"] + " " + product_data["name"]
+            for product_data in products_data
+        ))
         
         # 3. Dodaj przykładowe shop_products (bez URL - musisz je dodać ręcznie)
         print("\n🔗 Tworzenie połączeń produkt-sklep...")
@@ -102,20 +102,27 @@ def create_sample_data():
         print("    Przykład: POST /shop-products z odpowiednimi danymi\n")
         
         # Przykładowe połączenia (bez URL i extraction_config)
-        for product in products:
-            for shop in shops[:2]:  # Tylko 2 pierwsze sklepy dla przykładu
-                shop_product = models.ShopProduct(
-                    product_id=product.id,
-                    shop_id=shop.id,
-                    shop_product_url=f"https://example.com/product/{product.id}",  # Placeholder
-                    extraction_config={
+        shop_product_rows = []
+        created_names = []
+        for product_id, product_data in zip(product_ids, products_data):
+            # Tylko 2 pierwsze sklepy dla przykładu
+            for shop_id, shop_data in zip(shop_ids[:2], shops_data[:2]):
+                shop_product_rows.append({
+                    "product_id": product_id,
+                    "shop_id": shop_id,
+                    "shop_product_url": f"https://example.com/product/{product_id}",  # Placeholder
+                    "extraction_config": {
                         "selector_price": ".price",  # Placeholder - wymaga dostosowania!
                         "note": "To jest przykładowy selector - musisz go dostosować do konkretnej strony!"
                     }
-                )
-                db.add(shop_product)
-                print(f"  ✓ {product.name} @ {shop.name}")
+                })
+                created_names.append(
+                    "  ✓ " + product_data["name"] + " @ " + shop_data["name"])
+
+        db.execute(insert(models.ShopProduct), shop_product_rows)
+        print("\n".join(created_names))
         
+        # Jedna transakcja na cały seed - jeden commit zamiast trzech
         db.commit()
         
         print("\n✅ Inicjalizacja zakończona!")
@@ -0,0 +1,65 @@
+"""add price_snapshots composite indexes
+
+Revision ID: 3b283b83ff8c
+Revises: a3cd09281867
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b283b83ff8c'
+down_revision: Union[str, Sequence[str], None] = 'a3cd09281867'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction - don't lock writers
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_price_snapshots_product_created',
+            'price_snapshots',
+            ['product_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_price_snapshots_shop_created',
+            'price_snapshots',
+            ['shop_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_price_snapshots_product_shop_created',
+            'price_snapshots',
+            ['product_id', 'shop_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_price_snapshots_product_shop_created',
+            table_name='price_snapshots',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_price_snapshots_shop_created',
+            table_name='price_snapshots',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_price_snapshots_product_created',
+            table_name='price_snapshots',
+            postgresql_concurrently=True,
+        )
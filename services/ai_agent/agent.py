@@ -1,15 +1,121 @@
 """AI Agent Service - REAL SCRAPING VERSION"""
 
 import os
-import json
+import asyncio
 import hashlib
-from typing import Optional, List, Dict
+import logging
+import heapq
+import time
+from collections import OrderedDict
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
-import httpx
+import orjson
+import redis.asyncio as aioredis
 from services.scraper.store_scrapers import get_scraper
 
 
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Shared connection pool - one TCP connection set for all cache calls.
+# Values stay as raw bytes; orjson parses them without a str decode.
+_REDIS = aioredis.Redis(
+    connection_pool=aioredis.ConnectionPool.from_url(
+        REDIS_URL, max_connections=32))
+
+
+async def close_redis():
+    """Disconnect the shared Redis pool (call on app exit)"""
+    await _REDIS.connection_pool.disconnect()
+
+
+# Small in-process LRU in front of Redis - repeat lookups within the TTL
+# never leave the process. Entries go stale at most LOCAL_CACHE_TTL seconds.
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_TTL = 300
+_LOCAL_CACHE: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+
+def _local_get(cache_key: str) -> Optional[Dict]:
+    entry = _LOCAL_CACHE.get(cache_key)
+    if entry is None:
+        return None
+
+    expires_at, data = entry
+    if expires_at < time.monotonic():
+        del _LOCAL_CACHE[cache_key]
+        return None
+
+    _LOCAL_CACHE.move_to_end(cache_key)
+    return dict(data)
+
+
+def _local_put(cache_key: str, data: Dict):
+    _LOCAL_CACHE[cache_key] = (time.monotonic() + LOCAL_CACHE_TTL, dict(data))
+    _LOCAL_CACHE.move_to_end(cache_key)
+    while len(_LOCAL_CACHE) > LOCAL_CACHE_SIZE:
+        _LOCAL_CACHE.popitem(last=False)
+
+
+def clear_local_cache():
+    """Drop the in-process price cache (Redis is untouched)"""
+    _LOCAL_CACHE.clear()
+
+
+async def clear_price_cache(batch_size: int = 500) -> int:
+    """Remove all cached prices - SCAN + UNLINK, never blocks Redis"""
+    clear_local_cache()
+
+    deleted = 0
+    batch = []
+    async for key in _REDIS.scan_iter(match="scrape:*", count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            deleted += await _REDIS.unlink(*batch)
+            batch = []
+    if batch:
+        deleted += await _REDIS.unlink(*batch)
+    return deleted
+
+
+# In-flight scrapes keyed by cache key - concurrent identical requests
+# share one scrape instead of stampeding the store
+_INFLIGHT: Dict[str, "asyncio.Future[Optional[Dict]]"] = {}
+
+# Stores searched by find_best_price
+_DEFAULT_STORES = ("Zooplus", "Kakadu", "MaxiZoo")
+
+# Mock data as fallback (read-only - copy before handing out)
+_MOCK_RESULTS = (
+    MappingProxyType({
+        "store_name": "Zooplus",
+        "url": "https://www.zooplus.pl/shop/royal_canin",
+        "price": 189.96,
+        "currency": "PLN",
+        "source": "mock"
+    }),
+    MappingProxyType({
+        "store_name": "Kakadu",
+        "url": "https://www.kakadu.pl/royal-canin",
+        "price": 199.99,
+        "currency": "PLN",
+        "source": "mock"
+    }),
+    MappingProxyType({
+        "store_name": "MaxiZoo",
+        "url": "https://www.maxizoo.pl/royal-canin",
+        "price": 209.99,
+        "currency": "PLN",
+        "source": "mock"
+    }),
+)
+_MOCK_BY_STORE = {m["store_name"]: m for m in _MOCK_RESULTS}
+
+
 class AIAgent:
     """Autonomous AI Agent with REAL scraping"""
 
@@ -26,35 +132,49 @@ class AIAgent:
         self.cache_ttl = 3600
         self.use_cache = True
 
+        # Max seconds to wait for a single store before using mock data
+        self.scrape_timeout = 60
+
     def _get_cache_key(self, product_name: str, store_name: str) -> str:
         """Generate cache key for product/store combo"""
-        key_data = "{0}:{1}".format(product_name, store_name).lower()
+        # Fixed-size digest - product_name comes straight from the request
+        key_data = "{0}:{1}".format(product_name, store_name).casefold()
         return "scrape:{0}".format(
-            hashlib.md5(key_data.encode()).hexdigest())
+            hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest())
 
-    async def _get_cached_price(
-            self, product_name: str, store_name: str) -> Optional[Dict]:
-        """Get cached price from Redis"""
-        if not self.use_cache:
-            return None
-
-        try:
-            import redis
-            r = redis.Redis(
-                host='redis', port=6379, db=0, decode_responses=True)
+    async def _get_cached_prices(
+            self, product_name: str, store_names: List[str]) -> Dict[str, Dict]:
+        """Get cached prices for several stores (local LRU, then one MGET)"""
+        if not self.use_cache or not store_names:
+            return {}
 
+        hits = {}
+        missing = []
+        for store_name in store_names:
             cache_key = self._get_cache_key(product_name, store_name)
-            cached = r.get(cache_key)
+            data = _local_get(cache_key)
+            if data is not None:
+                hits[store_name] = data
+            else:
+                missing.append((store_name, cache_key))
+
+        if not missing:
+            return hits
 
-            if cached:
-                data = json.loads(cached)
-                print("[CACHE] Hit for {0}: {1}".format(
-                    store_name, product_name))
-                return data
+        try:
+            values = await _REDIS.mget([key for _, key in missing])
+
+            for (store_name, cache_key), cached in zip(missing, values):
+                if cached:
+                    data = orjson.loads(cached)
+                    _local_put(cache_key, data)
+                    hits[store_name] = data
+                    logger.debug("[CACHE] Hit for %s: %s",
+                                 store_name, product_name)
         except Exception as e:
-            print("[CACHE] Error: {0}".format(e))
+            logger.warning("[CACHE] Error: %s", e)
 
-        return None
+        return hits
 
     async def _cache_price(
             self, product_name: str, store_name: str, price_data: Dict):
@@ -63,48 +183,56 @@ class AIAgent:
             return
 
         try:
-            import redis
-            r = redis.Redis(
-                host='redis', port=6379, db=0, decode_responses=True)
-
             cache_key = self._get_cache_key(product_name, store_name)
-            r.setex(cache_key, self.cache_ttl,
-                    json.dumps(price_data, default=str))
-            print("[CACHE] Stored {0}: {1}".format(store_name, product_name))
+            await _REDIS.setex(cache_key, self.cache_ttl,
+                               orjson.dumps(price_data, default=str))
+            _local_put(cache_key, price_data)
+            logger.debug("[CACHE] Stored %s: %s", store_name, product_name)
         except Exception as e:
-            print("[CACHE] Error: {0}".format(e))
+            logger.warning("[CACHE] Error: %s", e)
 
     async def scrape_store_real(
         self, product_name: str, store_name: str
+    ) -> Optional[Dict]:
+        """Scrape real price from store (single-flight per product/store)
+
+        Does not consult the cache - find_best_price looks up all stores
+        in one batch before scraping the misses.
+        """
+        cache_key = self._get_cache_key(product_name, store_name)
+
+        pending = _INFLIGHT.get(cache_key)
+        if pending is not None:
+            logger.info("[REAL SCRAPER] Joining in-flight scrape %s: %s",
+                        store_name, product_name)
+            result = await asyncio.shield(pending)
+            return dict(result) if result else result
+
+        task = asyncio.ensure_future(
+            self._scrape_store(product_name, store_name))
+        _INFLIGHT[cache_key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(cache_key, None))
+        return await asyncio.shield(task)
+
+    async def _scrape_store(
+        self, product_name: str, store_name: str
     ) -> Optional[Dict]:
         """Scrape real price from store"""
-        print("[REAL SCRAPER] Searching {0} for: {1}".format(
-            store_name, product_name))
-
-        # Check cache first
-        cached = await self._get_cached_price(product_name, store_name)
-        if cached:
-            return cached
+        logger.info("[REAL SCRAPER] Searching %s for: %s",
+                    store_name, product_name)
 
         # Get scraper
         scraper = get_scraper(store_name)
         if not scraper:
-            print("[REAL SCRAPER] No scraper for: {0}".format(store_name))
+            logger.warning("[REAL SCRAPER] No scraper for: %s", store_name)
             return None
 
         try:
-            # Search for product
-            product_url = await scraper.search_product(product_name)
-            if not product_url:
-                print("[REAL SCRAPER] Product not found on {0}".format(
-                    store_name))
-                return None
-
-            # Scrape price
-            price_data = await scraper.scrape_price(product_url)
+            # Search and scrape price in one page session
+            price_data = await scraper.search_and_scrape(product_name)
             if not price_data:
-                print("[REAL SCRAPER] Could not scrape price from {0}".format(
-                    store_name))
+                logger.info("[REAL SCRAPER] Could not scrape price from %s",
+                            store_name)
                 return None
 
             # Format result
@@ -119,96 +247,110 @@ class AIAgent:
             # Cache it
             await self._cache_price(product_name, store_name, result)
 
-            print("[REAL SCRAPER] ✓ {0}: {1} PLN".format(
-                store_name, result['price']))
+            logger.info("[REAL SCRAPER] ✓ %s: %s PLN",
+                        store_name, result['price'])
             return result
 
         except Exception as e:
-            print("[REAL SCRAPER] Error scraping {0}: {1}".format(
-                store_name, e))
+            logger.warning("[REAL SCRAPER] Error scraping %s: %s",
+                           store_name, e)
             return None
 
     async def find_best_price(
         self,
         product_name: str,
         max_stores: int = 5,
-        use_real_scraper: bool = True
+        use_real_scraper: bool = True,
+        top_k: Optional[int] = None
     ) -> List[Dict]:
-        """Find best price across stores"""
-        print("[AI AGENT] Starting search for: {0}".format(product_name))
-        mode = 'REAL SCRAPER' if use_real_scraper else 'MOCK DATA'
-        print("[AI AGENT] Mode: {0}".format(mode))
-
-        # Mock data as fallback
-        mock_results = [
-            {
-                "store_name": "Zooplus",
-                "url": "https://www.zooplus.pl/shop/royal_canin",
-                "price": 189.96,
-                "currency": "PLN",
-                "source": "mock"
-            },
-            {
-                "store_name": "Kakadu",
-                "url": "https://www.kakadu.pl/royal-canin",
-                "price": 199.99,
-                "currency": "PLN",
-                "source": "mock"
-            },
-            {
-                "store_name": "MaxiZoo",
-                "url": "https://www.maxizoo.pl/royal-canin",
-                "price": 209.99,
-                "currency": "PLN",
-                "source": "mock"
-            }
-        ]
+        """Find best price across stores
+
+        If top_k is given, only the top_k cheapest results are returned.
+        """
+        logger.info("[AI AGENT] Starting search for: %s (mode: %s)",
+                    product_name,
+                    "REAL SCRAPER" if use_real_scraper else "MOCK DATA")
 
         # Use mock data if real scraper disabled
         if not use_real_scraper:
-            print("[AI AGENT] Using mock data")
-            return mock_results[:max_stores]
+            logger.info("[AI AGENT] Using mock data")
+            return [dict(m) for m in _MOCK_RESULTS[:max_stores]]
 
         # REAL SCRAPING
-        stores_to_scrape = ["Zooplus", "Kakadu", "MaxiZoo"][:max_stores]
+        stores_to_scrape = _DEFAULT_STORES[:max_stores]
 
         results = []
         failed_stores = []
 
-        # Scrape each store
+        # One round-trip for all cache lookups, scrape only the misses
+        cached = await self._get_cached_prices(product_name, stores_to_scrape)
+        to_scrape = [s for s in stores_to_scrape if s not in cached]
+
+        # Scrape all missing stores concurrently
+        scraped = await asyncio.gather(
+            *(asyncio.wait_for(
+                self.scrape_store_real(product_name, store_name),
+                self.scrape_timeout)
+              for store_name in to_scrape),
+            return_exceptions=True
+        )
+        scraped_by_store = dict(zip(to_scrape, scraped))
+
         for store_name in stores_to_scrape:
-            try:
-                result = await self.scrape_store_real(
-                    product_name, store_name)
-                if result:
-                    result["source"] = "real"
-                    results.append(result)
-                else:
-                    failed_stores.append(store_name)
-            except Exception as e:
-                print("[AI AGENT] Failed to scrape {0}: {1}".format(
-                    store_name, e))
+            if store_name in cached:
+                result = cached[store_name]
+            else:
+                result = scraped_by_store[store_name]
+
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning("[AI AGENT] Timed out scraping %s", store_name)
+                failed_stores.append(store_name)
+            elif isinstance(result, Exception):
+                logger.warning("[AI AGENT] Failed to scrape %s: %s",
+                               store_name, result)
+                failed_stores.append(store_name)
+            elif result:
+                result["source"] = "real"
+                results.append(result)
+            else:
                 failed_stores.append(store_name)
 
         # If all stores failed, use mock data
         if not results:
-            print("[AI AGENT] All stores failed, using mock data")
-            return mock_results[:max_stores]
+            logger.warning("[AI AGENT] All stores failed, using mock data")
+            return [dict(m) for m in _MOCK_RESULTS[:max_stores]]
 
         # If some stores failed, add mock data for failed stores
         if failed_stores and len(results) < max_stores:
-            print("[AI AGENT] Some stores failed, using mock supplement")
+            logger.info("[AI AGENT] Some stores failed, using mock supplement")
             mock_supplement = [
-                m for m in mock_results if m["store_name"] in failed_stores]
+                dict(_MOCK_BY_STORE[store_name])
+                for store_name in failed_stores
+                if store_name in _MOCK_BY_STORE]
             results.extend(mock_supplement[:max_stores - len(results)])
 
         # Sort by price
-        results.sort(key=lambda x: x["price"])
-
-        print("[AI AGENT] Found {0} results:".format(len(results)))
-        for r in results:
-            source_emoji = "🕷️" if r["source"] == "real" else "📦"
-            print("[AI AGENT]   {0} {1}: {2} PLN".format(
-                source_emoji, r['store_name'], r['price']))
+        if top_k is not None:
+            results = heapq.nsmallest(top_k, results, key=itemgetter("price"))
+        else:
+            results.sort(key=itemgetter("price"))
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[AI AGENT] Found %d results:", len(results))
+            for r in results:
+                source_emoji = "🕷️" if r["source"] == "real" else "📦"
+                logger.info("[AI AGENT]   %s %s: %s PLN",
+                            source_emoji, r['store_name'], r['price'])
 
         return results
+
+
+_AGENT: Optional[AIAgent] = None
+
+
+def get_agent() -> AIAgent:
+    """Return the shared AIAgent, created (and validated) on first use"""
+    global _AGENT
+    if _AGENT is None:
+        _AGENT = AIAgent()
+    return _AGENT
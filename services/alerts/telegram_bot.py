@@ -3,14 +3,38 @@ import os
 import httpx
 
 
+PRICE_DROP_TEMPLATE = (
+    "🔥 OBNIŻKA!\n\n"
+    "📦 {product_name}\n🏪 {shop_name}\n\n"
+    "💵 {old_price:.2f} → {new_price:.2f} PLN\n"
+    "📉 -{discount_percent:.1f}%\n\n🔗 {url}"
+)
+
+
 class TelegramBot:
     def __init__(self):
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        self.api_url = (
+            "https://api.telegram.org/bot{0}/sendMessage"
+        ).format(self.bot_token)
+        self._client = None
 
     def is_configured(self):
         return bool(self.bot_token and self.chat_id)
 
+    @property
+    def client(self):
+        """Keep-alive client reused across alerts"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def send_price_drop_alert(
             self,
             product_name,
@@ -22,28 +46,19 @@ class TelegramBot:
         if not self.is_configured():
             return False
         try:
-            message = (
-                "🔥 OBNIŻKA!\n\n"
-                "📦 {0}\n🏪 {1}\n\n"
-                "💵 {2:.2f} → {3:.2f} PLN\n"
-                "📉 -{4:.1f}%\n\n🔗 {5}"
-            ).format(
-                product_name,
-                shop_name,
-                old_price,
-                new_price,
-                discount_percent,
-                url
+            message = PRICE_DROP_TEMPLATE.format(
+                product_name=product_name,
+                shop_name=shop_name,
+                old_price=old_price,
+                new_price=new_price,
+                discount_percent=discount_percent,
+                url=url
+            )
+            response = await self.client.post(
+                self.api_url,
+                json={"chat_id": self.chat_id, "text": message}
             )
-            api_url = (
-                "https://api.telegram.org/bot{0}/sendMessage"
-            ).format(self.bot_token)
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    api_url,
-                    json={"chat_id": self.chat_id, "text": message}
-                )
-                return response.status_code == 200
+            return response.status_code == 200
         except Exception as e:
             print("[TELEGRAM] Error: {0}".format(e))
             return False
@@ -1,7 +1,9 @@
 # services/api/db.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
+import time
 
 Base = declarative_base()
 
@@ -12,6 +14,10 @@ DATABASE_URL = os.getenv(
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the health probe - psycopg 3 speaks asyncio natively,
+# so the same URL works and the check doesn't block the event loop
+async_engine = create_async_engine(DATABASE_URL, pool_pre_ping=True)
+
 
 def get_db():
     db = SessionLocal()
@@ -21,9 +27,26 @@ def get_db():
         db.close()
 
 
-def check_db_connection():
+HEALTH_SQL = text("SELECT 1")
+HEALTH_TTL_SECONDS = 1.0
+
+# (checked_at, ok) - health probes within the TTL reuse the last result
+_last_health = None
+
+
+async def check_db_connection():
+    global _last_health
+
+    now = time.monotonic()
+    if _last_health is not None and now - _last_health[0] < HEALTH_TTL_SECONDS:
+        return _last_health[1]
+
     try:
-        with engine.connect():
-            return True
+        async with async_engine.connect() as conn:
+            await conn.execute(HEALTH_SQL)
+        ok = True
     except Exception:
-        return False
+        ok = False
+
+    _last_health = (now, ok)
+    return ok
@@ -1,22 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 from typing import List
+import logging
 import os
 
-from .db import check_db_connection
+from .db import async_engine, check_db_connection
 from services.api.routers.products import router as products_router
 from services.api.routers.shops import router as shops_router
 from services.api.routers.shop_products import router as shop_products_router
 from services.api.routers.analytics import router as analytics_router
 from services.api.routers.ai_agent import router as ai_agent_router
 from services.api.routers.alerts import router as alerts_router
+from services.scraper.browser_pool import close_browser
+from services.scraper.cache import close_redis as close_search_cache
+from services.scraper.fast_fetch import aclose as close_http_client
+from services.alerts.telegram_bot import telegram_bot
+from services.ai_agent.agent import close_redis
+
+
+# App loggers (services.*) - set LOG_LEVEL=WARNING to silence scrape chatter
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close shared clients (browser, HTTP, Redis, DB) on shutdown"""
+    yield
+    # Each close runs even if an earlier one fails (e.g. a crashed browser)
+    for close in (
+        close_browser,
+        close_http_client,
+        close_search_cache,
+        telegram_bot.aclose,
+        close_redis,
+        async_engine.dispose,
+    ):
+        try:
+            await close()
+        except Exception:
+            logger.exception("[SHUTDOWN] %s failed", close.__qualname__)
 
 
 app = FastAPI(
     title="Cat Food Price Agent API",
     version="0.3.0",
     description="🤖 AI-Powered autonomous cat food price monitoring with Claude API.",
+    lifespan=lifespan,
 )
 
 
@@ -46,17 +78,17 @@ async def health_check():
 @app.get("/db-health", response_model=DBHealthResponse)
 async def db_health_check():
     """Database health check"""
-    ok = check_db_connection()
+    ok = await check_db_connection()
     return DBHealthResponse(status="ok" if ok else "error")
 
 
-@app.get("/", response_class=HTMLResponse)
-async def dashboard():
-    """Main dashboard HTML"""
-    dashboard_path = os.path.join(os.path.dirname(__file__), "dashboard.html")
+DASHBOARD_PATH = os.path.join(os.path.dirname(__file__), "dashboard.html")
 
-    if os.path.exists(dashboard_path):
-        with open(dashboard_path, "r", encoding="utf-8") as f:
+
+def _render_dashboard() -> bytes:
+    """Render the dashboard HTML once (file or built-in fallback)"""
+    if os.path.exists(DASHBOARD_PATH):
+        with open(DASHBOARD_PATH, "rb") as f:
             return f.read()
 
     # Fallback if dashboard.html doesn't exist
@@ -141,7 +173,17 @@ async def dashboard():
             </div>
         </body>
     </html>
-    """
+    """.encode("utf-8")
+
+
+_DASHBOARD_BYTES = _render_dashboard()
+_DASHBOARD_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+
+@app.get("/", response_class=HTMLResponse)
+async def dashboard():
+    """Main dashboard HTML"""
+    return HTMLResponse(content=_DASHBOARD_BYTES, headers=_DASHBOARD_HEADERS)
 
 
 # Register routers
@@ -7,7 +7,9 @@ from sqlalchemy import (
     Numeric,
     DateTime,
     ForeignKey,
+    Index,
     JSON,
+    text,
 )
 from sqlalchemy.orm import relationship
 
@@ -79,6 +81,15 @@ class ShopProduct(Base):
 
 class PriceSnapshot(Base):
     __tablename__ = "price_snapshots"
+    __table_args__ = (
+        # "najnowsza cena" lookups: filter by product/shop, newest first
+        Index("ix_price_snapshots_product_created",
+              "product_id", text("created_at DESC")),
+        Index("ix_price_snapshots_shop_created",
+              "shop_id", text("created_at DESC")),
+        Index("ix_price_snapshots_product_shop_created",
+              "product_id", "shop_id", text("created_at DESC")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -2,11 +2,13 @@
 AI Agent Router - Updated with REAL SCRAPING support
 """
 
+import os
 from typing import List, Optional
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 
-from services.ai_agent.agent import AIAgent
+from services.ai_agent.agent import get_agent, clear_price_cache
+from services.api.ttl_cache import ttl_cache
 
 
 router = APIRouter(
@@ -68,7 +70,7 @@ async def autonomous_search(request: ProductSearchRequest):
     - Kakadu.pl
     - MaxiZoo.pl
     """
-    agent = AIAgent()
+    agent = get_agent()
 
     # Perform search
     results = await agent.find_best_price(
@@ -89,9 +91,10 @@ async def autonomous_search(request: ProductSearchRequest):
     if results and any(r.get("source") == "mock" for r in results):
         mode = "mixed"  # Some real, some mock
 
+    # Results come normalized from AIAgent - skip per-row re-validation
     return ProductSearchResponse(
         product_name=request.product_name,
-        results=[PriceResult(**r) for r in results],
+        results=[PriceResult.model_construct(**r) for r in results],
         best_price=best_price,
         best_store=best_store,
         total_stores_found=len(results),
@@ -99,19 +102,8 @@ async def autonomous_search(request: ProductSearchRequest):
     )
 
 
-@router.get("/status")
-async def agent_status():
-    """
-    Check if AI Agent is configured properly
-
-    Shows:
-    - API key status
-    - Model being used
-    - Available capabilities
-    - Scraping mode available
-    """
-    import os
-
+@ttl_cache(60)
+def _compute_agent_status() -> dict:
     has_api_key = bool(os.getenv("ANTHROPIC_API_KEY"))
 
     return {
@@ -132,6 +124,24 @@ async def agent_status():
     }
 
 
+@router.get("/status")
+async def agent_status(refresh: bool = False):
+    """
+    Check if AI Agent is configured properly
+
+    Shows:
+    - API key status
+    - Model being used
+    - Available capabilities
+    - Scraping mode available
+
+    Cached for 60s, pass ?refresh=1 to re-read the environment.
+    """
+    if refresh:
+        _compute_agent_status.cache_clear()
+    return _compute_agent_status()
+
+
 @router.post("/clear-cache")
 async def clear_cache():
     """
@@ -141,14 +151,9 @@ async def clear_cache():
     Use this to force fresh scraping.
     """
     try:
-        import redis
-        r = redis.Redis(host='redis', port=6379, db=0)
-
-        # Get all scrape cache keys
-        keys = r.keys("scrape:*")
+        deleted = await clear_price_cache()
 
-        if keys:
-            deleted = r.delete(*keys)
+        if deleted:
             return {
                 "status": "success",
                 "message": f"Cleared {deleted} cached prices"
@@ -2,14 +2,20 @@
 AI Agent Router - Autonomous Product Search API
 """
 
+import asyncio
+import os
 from typing import List, Optional
+from urllib.parse import urlsplit
 from fastapi import APIRouter, Depends, BackgroundTasks
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from services.api.db import get_db
 from services.api import models
-from services.ai_agent.agent import AIAgent
+from services.api.routers.analytics import invalidate_current_prices
+from services.ai_agent.agent import get_agent
+from services.api.ttl_cache import ttl_cache
 
 
 router = APIRouter(
@@ -57,6 +63,16 @@ class AutoAddResponse(BaseModel):
     prices_found: List[PriceResult]
 
 
+# Validates a whole agent result list in one pass
+_PRICE_LIST = TypeAdapter(List[PriceResult])
+
+
+def _base_url(url: str) -> str:
+    """'https://www.zooplus.pl/shop/x' -> 'https://www.zooplus.pl'"""
+    parts = urlsplit(url)
+    return "{0}://{1}".format(parts.scheme, parts.netloc)
+
+
 @router.post("/search", response_model=ProductSearchResponse)
 async def autonomous_search(request: ProductSearchRequest):
     """
@@ -70,7 +86,7 @@ async def autonomous_search(request: ProductSearchRequest):
 
     No manual configuration needed!
     """
-    agent = AIAgent()
+    agent = get_agent()
 
     # Perform autonomous search
     results = await agent.find_best_price(request.product_name, request.max_stores)
@@ -84,13 +100,71 @@ async def autonomous_search(request: ProductSearchRequest):
 
     return ProductSearchResponse(
         product_name=request.product_name,
-        results=[PriceResult(**r) for r in results],
+        results=_PRICE_LIST.validate_python(results),
         best_price=best_price,
         best_store=best_store,
         total_stores_found=len(results)
     )
 
 
+def _persist_product(
+    db: Session, request: AutoAddRequest, results: List[dict]
+) -> int:
+    """Create product, shops, shop_products and snapshots - one commit"""
+    # Step 2: Create product in database (flush only - one commit at the end)
+    product = models.Product(
+        name=request.product_name,
+        brand=request.brand,
+        weight_grams=request.weight_grams,
+        target_price_pln=request.target_price_pln
+    )
+    db.add(product)
+    db.flush()
+
+    # Step 3: Upsert all shops in one statement, existing shops keep their data
+    shops_payload = {}
+    for result in results:
+        shops_payload.setdefault(result["store_name"], {
+            "name": result["store_name"],
+            "base_url": _base_url(result["url"]),
+            "country_code": "PL"
+        })
+
+    shop_stmt = pg_insert(models.Shop).values(list(shops_payload.values()))
+    shop_stmt = shop_stmt.on_conflict_do_update(
+        index_elements=[models.Shop.name],
+        set_={"name": shop_stmt.excluded.name}  # no-op, so RETURNING sees existing rows
+    ).returning(models.Shop.id, models.Shop.name)
+    shop_ids = {row.name: row.id for row in db.execute(shop_stmt)}
+
+    # Step 4: Add shop_products with AI extraction config + initial snapshots
+    db.add_all([
+        models.ShopProduct(
+            product_id=product.id,
+            shop_id=shop_ids[result["store_name"]],
+            shop_product_url=result["url"],
+            extraction_config={
+                "method": "ai_vision",  # Use AI instead of CSS selectors!
+                "model": "claude-3-5-sonnet",
+                "note": "Automatically configured by AI Agent"
+            }
+        )
+        for result in results
+    ])
+    db.add_all([
+        models.PriceSnapshot(
+            product_id=product.id,
+            shop_id=shop_ids[result["store_name"]],
+            price=result["price"],
+            currency=result["currency"]
+        )
+        for result in results
+    ])
+    db.commit()
+    invalidate_current_prices()
+    return product.id
+
+
 @router.post("/auto-add", response_model=AutoAddResponse)
 async def auto_add_product(
     request: AutoAddRequest,
@@ -110,7 +184,7 @@ async def auto_add_product(
 
     Everything is automatic - just provide product name!
     """
-    agent = AIAgent()
+    agent = get_agent()
 
     # Step 1: Search for product
     results = await agent.find_best_price(request.product_name, max_stores=5)
@@ -124,77 +198,22 @@ async def auto_add_product(
             prices_found=[]
         )
 
-    # Step 2: Create product in database
-    product = models.Product(
-        name=request.product_name,
-        brand=request.brand,
-        weight_grams=request.weight_grams,
-        target_price_pln=request.target_price_pln
-    )
-    db.add(product)
-    db.commit()
-    db.refresh(product)
-
-    # Step 3: Add shops and shop_products
-    added_count = 0
-
-    for result in results:
-        # Check if shop exists
-        shop = db.query(models.Shop).filter(
-            models.Shop.name == result["store_name"]
-        ).first()
-
-        if not shop:
-            # Create new shop
-            shop = models.Shop(
-                name=result["store_name"],
-                base_url=result["url"].split("/")[0] + "//" + result["url"].split("/")[2],
-                country_code="PL"
-            )
-            db.add(shop)
-            db.commit()
-            db.refresh(shop)
-
-        # Create shop_product with AI extraction config
-        shop_product = models.ShopProduct(
-            product_id=product.id,
-            shop_id=shop.id,
-            shop_product_url=result["url"],
-            extraction_config={
-                "method": "ai_vision",  # Use AI instead of CSS selectors!
-                "model": "claude-3-5-sonnet",
-                "note": "Automatically configured by AI Agent"
-            }
-        )
-        db.add(shop_product)
-
-        # Add initial price snapshot
-        snapshot = models.PriceSnapshot(
-            product_id=product.id,
-            shop_id=shop.id,
-            price=result["price"],
-            currency=result["currency"]
-        )
-        db.add(snapshot)
-
-        added_count += 1
-
-    db.commit()
+    # Steps 2-4: blocking DB work runs in a worker thread, not on the event loop
+    product_id = await asyncio.to_thread(
+        _persist_product, db, request, results)
+    added_count = len(results)
 
     return AutoAddResponse(
         success=True,
         message=f"Successfully added {request.product_name} with {added_count} shops",
-        product_id=product.id,
+        product_id=product_id,
         added_shops=added_count,
-        prices_found=[PriceResult(**r) for r in results]
+        prices_found=_PRICE_LIST.validate_python(results)
     )
 
 
-@router.get("/status")
-async def agent_status():
-    """Check if AI Agent is configured properly"""
-    import os
-
+@ttl_cache(60)
+def _compute_agent_status() -> dict:
     has_api_key = bool(os.getenv("ANTHROPIC_API_KEY"))
 
     return {
@@ -208,3 +227,11 @@ async def agent_status():
             "auto_product_addition"
         ]
     }
+
+
+@router.get("/status")
+async def agent_status(refresh: bool = False):
+    """Check if AI Agent is configured properly (cached for 60s, ?refresh=1 to re-read)"""
+    if refresh:
+        _compute_agent_status.cache_clear()
+    return _compute_agent_status()
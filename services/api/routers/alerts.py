@@ -4,6 +4,9 @@ from pydantic import BaseModel
 from typing import Optional
 import os
 
+from services.alerts.telegram_bot import telegram_bot
+from services.api.ttl_cache import ttl_cache
+
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
 
@@ -14,9 +17,8 @@ class AlertStatus(BaseModel):
     alert_email: Optional[str]
 
 
-@router.get("/status", response_model=AlertStatus)
-async def get_alert_status():
-    """Check alert configuration"""
+@ttl_cache(60)
+def _compute_alert_status() -> AlertStatus:
     telegram_ok = bool(
         os.getenv("TELEGRAM_BOT_TOKEN") and os.getenv("TELEGRAM_CHAT_ID"))
     email_ok = bool(
@@ -33,11 +35,17 @@ async def get_alert_status():
     )
 
 
+@router.get("/status", response_model=AlertStatus)
+async def get_alert_status(refresh: bool = False):
+    """Check alert configuration (cached for 60s, ?refresh=1 to re-read)"""
+    if refresh:
+        _compute_alert_status.cache_clear()
+    return _compute_alert_status()
+
+
 @router.post("/test")
 async def test_alert():
     """Send test alert"""
-    from services.alerts.telegram_bot import telegram_bot
-
     results = {}
 
     if telegram_bot.is_configured():
@@ -1,12 +1,23 @@
-from typing import List, Optional
+import threading
+import time
+from typing import Iterator, List, Literal, Optional
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Float, case, cast, desc, func
 from sqlalchemy.orm import Session
 
-from services.api.db import get_db
+from services.api.db import SessionLocal, get_db
 from services.api import models
-from services.api.schemas import PriceSnapshotRead, ProductWithCurrentPrice, BestDeal
+from services.api.schemas import (
+    PriceSnapshotRead,
+    ProductWithCurrentPrice,
+    BestDeal,
+    PRICE_SNAPSHOT_LIST_ADAPTER,
+    CURRENT_PRICE_LIST_ADAPTER,
+    list_json_response,
+)
 
 router = APIRouter(
     prefix="/analytics",
@@ -14,16 +25,47 @@ router = APIRouter(
 )
 
 
+# Rozmiar partii przy strumieniowaniu historii cen
+PRICE_HISTORY_CHUNK = 500
+
+
+def _price_history_query(db: Session, product_id: int, shop_id: Optional[int],
+                         date_from: datetime):
+    query = db.query(models.PriceSnapshot).filter(
+        models.PriceSnapshot.product_id == product_id,
+        models.PriceSnapshot.created_at >= date_from
+    )
+
+    if shop_id:
+        query = query.filter(models.PriceSnapshot.shop_id == shop_id)
+
+    return query.order_by(models.PriceSnapshot.created_at)
+
+
+def _stream_price_history(product_id: int, shop_id: Optional[int],
+                          date_from: datetime) -> Iterator[bytes]:
+    # Własna sesja - zależność get_db jest zamykana przed wysłaniem body
+    db = SessionLocal()
+    try:
+        query = _price_history_query(db, product_id, shop_id, date_from)
+        for snapshot in query.yield_per(PRICE_HISTORY_CHUNK):
+            yield PriceSnapshotRead.model_validate(snapshot).model_dump_json().encode() + b"\n"
+    finally:
+        db.close()
+
+
 @router.get("/price-history/{product_id}", response_model=List[PriceSnapshotRead])
 def get_price_history(
     product_id: int,
     shop_id: Optional[int] = None,
     days: int = Query(30, ge=1, le=365),
+    format: Literal["json", "ndjson"] = "json",
     db: Session = Depends(get_db)
 ):
     """
     Pobiera historię cen dla danego produktu.
     Opcjonalnie można filtrować po sklepie i okresie czasu.
+    Z `format=ndjson` wynik jest strumieniowany - jeden snapshot na linię.
     """
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if not product:
@@ -31,69 +73,149 @@ def get_price_history(
 
     date_from = datetime.utcnow() - timedelta(days=days)
 
-    query = db.query(models.PriceSnapshot).filter(
-        models.PriceSnapshot.product_id == product_id,
-        models.PriceSnapshot.created_at >= date_from
-    )
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_price_history(product_id, shop_id, date_from),
+            media_type="application/x-ndjson"
+        )
+
+    snapshots = _price_history_query(db, product_id, shop_id, date_from).all()
+    return list_json_response(PRICE_SNAPSHOT_LIST_ADAPTER, snapshots)
+
+
+# Cache /current-prices (stale-while-revalidate): świeży przez TTL,
+# potem jeszcze STALE sekund serwowany z odświeżeniem w tle
+CURRENT_PRICES_TTL = 30
+CURRENT_PRICES_STALE = 120
+
+_current_prices = {"body": None, "fetched_at": 0.0, "version": 0,
+                   "refreshing": False}
+_current_prices_lock = threading.Lock()
+
+
+def invalidate_current_prices() -> None:
+    """Drop the cached /current-prices payload after prices change"""
+    with _current_prices_lock:
+        _current_prices["body"] = None
+        _current_prices["version"] += 1
+
+
+def _build_current_prices(db: Session) -> bytes:
+    with _current_prices_lock:
+        version = _current_prices["version"]
+
+    items = CURRENT_PRICE_LIST_ADAPTER.validate_python(_query_current_prices(db))
+    body = CURRENT_PRICE_LIST_ADAPTER.dump_json(items)
+
+    with _current_prices_lock:
+        # Nie nadpisuj, jeśli w międzyczasie ktoś unieważnił cache
+        if _current_prices["version"] == version:
+            _current_prices["body"] = body
+            _current_prices["fetched_at"] = time.monotonic()
+    return body
 
-    if shop_id:
-        query = query.filter(models.PriceSnapshot.shop_id == shop_id)
 
-    snapshots = query.order_by(models.PriceSnapshot.created_at).all()
-    return snapshots
+def _refresh_current_prices() -> None:
+    db = SessionLocal()
+    try:
+        _build_current_prices(db)
+    finally:
+        db.close()
+        with _current_prices_lock:
+            _current_prices["refreshing"] = False
 
 
 @router.get("/current-prices", response_model=List[ProductWithCurrentPrice])
-def get_current_prices(db: Session = Depends(get_db)):
+def get_current_prices(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """
     Zwraca listę wszystkich produktów z ich najnowszymi cenami ze wszystkich sklepów.
     """
-    products = db.query(models.Product).all()
-    result = []
-
-    for product in products:
-        # Pobierz najnowszą cenę dla każdego sklepu
-        latest_prices = (
-            db.query(
-                models.PriceSnapshot.shop_id,
-                models.Shop.name.label("shop_name"),
-                models.PriceSnapshot.price,
-                models.PriceSnapshot.currency,
-                models.PriceSnapshot.created_at
-            )
-            .join(models.Shop)
-            .filter(models.PriceSnapshot.product_id == product.id)
-            .order_by(models.PriceSnapshot.shop_id, desc(models.PriceSnapshot.created_at))
-            .distinct(models.PriceSnapshot.shop_id)
-            .all()
+    with _current_prices_lock:
+        body = _current_prices["body"]
+        age = time.monotonic() - _current_prices["fetched_at"]
+        stale = body is not None and age >= CURRENT_PRICES_TTL
+        if stale and age >= CURRENT_PRICES_TTL + CURRENT_PRICES_STALE:
+            body = None
+        elif stale and not _current_prices["refreshing"]:
+            _current_prices["refreshing"] = True
+            background_tasks.add_task(_refresh_current_prices)
+
+    if body is None:
+        body = _build_current_prices(db)
+    return Response(body, media_type="application/json")
+
+
+def _query_current_prices(db: Session) -> List[dict]:
+    # Najnowsza cena per (produkt, sklep) przez DISTINCT ON
+    latest = (
+        db.query(
+            models.PriceSnapshot.product_id,
+            models.PriceSnapshot.shop_id,
+            # float już z bazy - bez Decimal po stronie Pythona
+            cast(models.PriceSnapshot.price, Float).label("price"),
+            models.PriceSnapshot.currency,
+            models.PriceSnapshot.created_at
+        )
+        .order_by(models.PriceSnapshot.product_id,
+                  models.PriceSnapshot.shop_id,
+                  desc(models.PriceSnapshot.created_at))
+        .distinct(models.PriceSnapshot.product_id,
+                  models.PriceSnapshot.shop_id)
+        .subquery()
+    )
+
+    # Jedno zapytanie; najniższa z najnowszych cen liczona oknem w bazie
+    rows = (
+        db.query(
+            models.Product,
+            latest.c.shop_id,
+            models.Shop.name.label("shop_name"),
+            latest.c.price,
+            latest.c.currency,
+            latest.c.created_at,
+            func.min(latest.c.price).over(
+                partition_by=models.Product.id).label("min_price")
         )
+        .outerjoin(latest, latest.c.product_id == models.Product.id)
+        .outerjoin(models.Shop, models.Shop.id == latest.c.shop_id)
+        .order_by(models.Product.id, latest.c.shop_id)
+        .all()
+    )
 
-        prices = [
-            {
-                "shop_id": p.shop_id,
-                "shop_name": p.shop_name,
-                "price": float(p.price),
-                "currency": p.currency,
-                "updated_at": p.created_at
+    # Grupowanie płaskich wierszy po produkcie
+    by_product = {}
+    for row in rows:
+        product = row.Product
+        item = by_product.get(product.id)
+        if item is None:
+            item = by_product[product.id] = {
+                "id": product.id,
+                "name": product.name,
+                "brand": product.brand,
+                "weight_grams": product.weight_grams,
+                "target_price_pln": float(product.target_price_pln) if product.target_price_pln else None,
+                "prices": [],
+                "min_price": row.min_price,
+                "price_count": 0
             }
-            for p in latest_prices
-        ]
-
-        # Znajdź najniższą cenę
-        min_price = min([p["price"] for p in prices]) if prices else None
-
-        result.append({
-            "id": product.id,
-            "name": product.name,
-            "brand": product.brand,
-            "weight_grams": product.weight_grams,
-            "target_price_pln": float(product.target_price_pln) if product.target_price_pln else None,
-            "prices": prices,
-            "min_price": min_price,
-            "price_count": len(prices)
+
+        # Produkt bez żadnych cen (outer join)
+        if row.shop_id is None:
+            continue
+
+        item["prices"].append({
+            "shop_id": row.shop_id,
+            "shop_name": row.shop_name,
+            "price": row.price,
+            "currency": row.currency,
+            "updated_at": row.created_at
         })
+        item["price_count"] += 1
 
-    return result
+    return list(by_product.values())
 
 
 @router.get("/best-deals", response_model=List[BestDeal])
@@ -104,43 +226,61 @@ def get_best_deals(
     """
     Zwraca najlepsze oferty - produkty poniżej ceny docelowej lub z największym spadkiem cen.
     """
-    products = db.query(models.Product).filter(models.Product.target_price_pln.isnot(None)).all()
-    deals = []
+    # Najnowszy snapshot każdego produktu (DISTINCT ON)
+    latest = (
+        db.query(models.PriceSnapshot)
+        .order_by(models.PriceSnapshot.product_id,
+                  desc(models.PriceSnapshot.created_at))
+        .distinct(models.PriceSnapshot.product_id)
+        .subquery()
+    )
 
-    for product in products:
-        # Pobierz najnowszą najniższą cenę
-        latest_price = (
-            db.query(models.PriceSnapshot)
-            .filter(models.PriceSnapshot.product_id == product.id)
-            .order_by(desc(models.PriceSnapshot.created_at))
-            .first()
+    # Filtrowanie, sortowanie po rabacie i limit po stronie bazy
+    discount = (
+        (models.Product.target_price_pln - latest.c.price)
+        / models.Product.target_price_pln
+    )
+    rows = (
+        db.query(
+            models.Product.id,
+            models.Product.name,
+            models.Product.brand,
+            cast(models.Product.target_price_pln, Float).label("target_price_pln"),
+            latest.c.shop_id,
+            models.Shop.name.label("shop_name"),
+            cast(latest.c.price, Float).label("price"),
+            latest.c.created_at
         )
+        .join(latest, latest.c.product_id == models.Product.id)
+        .outerjoin(models.Shop, models.Shop.id == latest.c.shop_id)
+        .filter(
+            models.Product.target_price_pln > 0,
+            latest.c.price <= models.Product.target_price_pln
+        )
+        .order_by(desc(discount))
+        .limit(limit)
+        .all()
+    )
 
-        if not latest_price:
-            continue
-
-        current_price = float(latest_price.price)
-        target_price = float(product.target_price_pln)
-
-        if current_price <= target_price:
-            shop = db.query(models.Shop).filter(models.Shop.id == latest_price.shop_id).first()
-            discount_percent = ((target_price - current_price) / target_price) * 100
-
-            deals.append({
-                "product_id": product.id,
-                "product_name": product.name,
-                "brand": product.brand,
-                "shop_id": latest_price.shop_id,
-                "shop_name": shop.name if shop else "Unknown",
-                "current_price": current_price,
-                "target_price": target_price,
-                "discount_percent": round(discount_percent, 2),
-                "updated_at": latest_price.created_at
-            })
+    deals = []
+    for row in rows:
+        current_price = row.price
+        target_price = row.target_price_pln
+        discount_percent = ((target_price - current_price) / target_price) * 100
+
+        deals.append({
+            "product_id": row.id,
+            "product_name": row.name,
+            "brand": row.brand,
+            "shop_id": row.shop_id,
+            "shop_name": row.shop_name or "Unknown",
+            "current_price": current_price,
+            "target_price": target_price,
+            "discount_percent": round(discount_percent, 2),
+            "updated_at": row.created_at
+        })
 
-    # Sortuj po największym rabacie
-    deals.sort(key=lambda x: x["discount_percent"], reverse=True)
-    return deals[:limit]
+    return deals
 
 
 @router.get("/price-trends/{product_id}")
@@ -159,30 +299,48 @@ def get_price_trends(
 
     date_from = datetime.utcnow() - timedelta(days=days)
 
-    snapshots = (
-        db.query(models.PriceSnapshot)
+    # Numeracja snapshotów w oknie - agregaty liczone w bazie
+    numbered = (
+        db.query(
+            models.PriceSnapshot.price.label("price"),
+            func.row_number().over(
+                order_by=(models.PriceSnapshot.created_at,
+                          models.PriceSnapshot.id)
+            ).label("rn"),
+            func.count().over().label("total")
+        )
         .filter(
             models.PriceSnapshot.product_id == product_id,
             models.PriceSnapshot.created_at >= date_from
         )
-        .order_by(models.PriceSnapshot.created_at)
-        .all()
+        .subquery()
     )
 
-    if not snapshots:
+    # Prosty trend - pierwsza i ostatnia 1/3 próbek (min. 3 przy małych danych),
+    # tak jak prices[:n//3] / prices[-n//3:]
+    total = numbered.c.total
+    head_size = case((total > 9, total // 3), else_=3)
+    tail_size = case((total > 9, (total + 2) // 3), else_=3)
+
+    stats = db.query(
+        func.count().label("data_points"),
+        func.avg(numbered.c.price).label("avg_price"),
+        func.min(numbered.c.price).label("min_price"),
+        func.max(numbered.c.price).label("max_price"),
+        func.avg(numbered.c.price).filter(
+            numbered.c.rn <= head_size).label("avg_first"),
+        func.avg(numbered.c.price).filter(
+            numbered.c.rn > total - tail_size).label("avg_last")
+    ).one()
+
+    if not stats.data_points:
         raise HTTPException(status_code=404, detail="No price data available")
 
-    prices = [float(s.price) for s in snapshots]
-    avg_price = sum(prices) / len(prices)
-    min_price = min(prices)
-    max_price = max(prices)
-
-    # Prosty trend - porównanie pierwszych i ostatnich 3 dni
-    first_week = prices[:len(prices)//3] if len(prices) > 9 else prices[:3]
-    last_week = prices[-len(prices)//3:] if len(prices) > 9 else prices[-3:]
-
-    avg_first = sum(first_week) / len(first_week)
-    avg_last = sum(last_week) / len(last_week)
+    avg_price = float(stats.avg_price)
+    min_price = float(stats.min_price)
+    max_price = float(stats.max_price)
+    avg_first = float(stats.avg_first)
+    avg_last = float(stats.avg_last)
 
     if avg_last < avg_first * 0.95:
         trend = "falling"
@@ -195,7 +353,7 @@ def get_price_trends(
         "product_id": product_id,
         "product_name": product.name,
         "period_days": days,
-        "data_points": len(snapshots),
+        "data_points": stats.data_points,
         "average_price": round(avg_price, 2),
         "min_price": round(min_price, 2),
         "max_price": round(max_price, 2),
@@ -5,7 +5,13 @@ from sqlalchemy.orm import Session
 
 from services.api.db import get_db
 from services.api import models
-from services.api.schemas import ProductCreate, ProductRead
+from services.api.routers.analytics import invalidate_current_prices
+from services.api.schemas import (
+    ProductCreate,
+    ProductRead,
+    PRODUCT_LIST_ADAPTER,
+    list_json_response,
+)
 
 router = APIRouter(
     prefix="/products",
@@ -16,7 +22,7 @@ router = APIRouter(
 @router.get("/", response_model=List[ProductRead])
 def list_products(db: Session = Depends(get_db)):
     products = db.query(models.Product).order_by(models.Product.id).all()
-    return products
+    return list_json_response(PRODUCT_LIST_ADAPTER, products)
 
 
 @router.post("/", response_model=ProductRead, status_code=status.HTTP_201_CREATED)
@@ -29,6 +35,7 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
     )
     db.add(product)
     db.commit()
+    invalidate_current_prices()
     db.refresh(product)
     return product
 
@@ -1,11 +1,16 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 
 from services.api.db import get_db
 from services.api import models
-from services.api.schemas import ShopProductCreate, ShopProductRead
+from services.api.schemas import (
+    ShopProductCreate,
+    ShopProductRead,
+    SHOP_PRODUCT_LIST_ADAPTER,
+    list_json_response,
+)
 
 router = APIRouter(
     prefix="/shop-products",
@@ -15,8 +20,16 @@ router = APIRouter(
 
 @router.get("/", response_model=List[ShopProductRead])
 def list_shop_products(db: Session = Depends(get_db)):
-    items = db.query(models.ShopProduct).order_by(models.ShopProduct.id).all()
-    return items
+    # ShopProductRead has no nested shop/product - forbid lazy loads so a
+    # future nested schema fails loudly instead of silently going N+1
+    # (add selectinload(models.ShopProduct.shop) etc. together with it)
+    items = (
+        db.query(models.ShopProduct)
+        .options(raiseload("*"))
+        .order_by(models.ShopProduct.id)
+        .all()
+    )
+    return list_json_response(SHOP_PRODUCT_LIST_ADAPTER, items)
 
 
 @router.post("/", response_model=ShopProductRead, status_code=status.HTTP_201_CREATED)
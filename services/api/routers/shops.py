@@ -5,7 +5,12 @@ from sqlalchemy.orm import Session
 
 from services.api.db import get_db
 from services.api import models
-from services.api.schemas import ShopCreate, ShopRead
+from services.api.schemas import (
+    ShopCreate,
+    ShopRead,
+    SHOP_LIST_ADAPTER,
+    list_json_response,
+)
 
 router = APIRouter(
     prefix="/shops",
@@ -16,7 +21,7 @@ router = APIRouter(
 @router.get("/", response_model=List[ShopRead])
 def list_shops(db: Session = Depends(get_db)):
     shops = db.query(models.Shop).order_by(models.Shop.id).all()
-    return shops
+    return list_json_response(SHOP_LIST_ADAPTER, shops)
 
 
 @router.post("/", response_model=ShopRead, status_code=status.HTTP_201_CREATED)
@@ -1,7 +1,8 @@
 from datetime import datetime
 from typing import Optional, List
 
-from pydantic import BaseModel, Field
+from fastapi import Response
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 # ---------- PRODUCT ----------
@@ -81,6 +82,21 @@ class PriceSnapshotRead(BaseModel):
         from_attributes = True
 
 
+# ---------- LIST ADAPTERS ----------
+# Built once; validate + dump a whole ORM result list in one pydantic-core pass
+
+PRODUCT_LIST_ADAPTER = TypeAdapter(List[ProductRead])
+SHOP_LIST_ADAPTER = TypeAdapter(List[ShopRead])
+SHOP_PRODUCT_LIST_ADAPTER = TypeAdapter(List[ShopProductRead])
+PRICE_SNAPSHOT_LIST_ADAPTER = TypeAdapter(List[PriceSnapshotRead])
+
+
+def list_json_response(adapter: TypeAdapter, rows) -> Response:
+    """Serialize ORM rows straight to JSON bytes with a list adapter"""
+    items = adapter.validate_python(rows, from_attributes=True)
+    return Response(adapter.dump_json(items), media_type="application/json")
+
+
 # ---------- ANALYTICS ----------
 
 class ShopPrice(BaseModel):
@@ -102,6 +118,9 @@ class ProductWithCurrentPrice(BaseModel):
     price_count: int
 
 
+CURRENT_PRICE_LIST_ADAPTER = TypeAdapter(List[ProductWithCurrentPrice])
+
+
 class BestDeal(BaseModel):
     product_id: int
     product_name: str
@@ -0,0 +1,27 @@
+"""Process-level TTL cache for cheap, rarely-changing handlers"""
+import time
+from functools import wraps
+
+
+def ttl_cache(ttl: float):
+    """Cache a no-argument function's result for `ttl` seconds.
+
+    The wrapped function gets `cache_clear()` to force a recompute.
+    """
+    def decorator(func):
+        state = {}
+
+        @wraps(func)
+        def wrapper():
+            now = time.monotonic()
+            if state and now < state["expires_at"]:
+                return state["value"]
+
+            value = func()
+            state["value"] = value
+            state["expires_at"] = now + ttl
+            return value
+
+        wrapper.cache_clear = state.clear
+        return wrapper
+    return decorator
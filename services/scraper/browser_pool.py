@@ -0,0 +1,147 @@
+"""Shared Playwright browser for all scrapers"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Route
+
+
+# Remote Chromium shared by all workers (e.g. ws://chromium:3000); when unset
+# each process launches its own
+CDP_ENDPOINT = os.getenv("CDP_ENDPOINT")
+
+# Headless scraping needs no GPU, extensions or background services;
+# --no-zygote requires the sandbox off (already Playwright's default)
+LAUNCH_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-features=TranslateUI,BackForwardCache",
+    "--no-sandbox",
+    "--no-zygote",
+    "--mute-audio",
+]
+
+# Max contexts (and so pages) open on the shared browser at once
+CONTEXT_POOL_SIZE = int(os.getenv("BROWSER_CONTEXT_POOL_SIZE", "8"))
+
+# Nothing here is needed to read a price - don't download it
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media", "stylesheet"})
+BLOCKED_HOSTS = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+)
+
+# Chromium is launched once and reused; contexts are recycled between scrapes
+_playwright = None
+_browser: Optional[Browser] = None
+_browser_lock: Optional[asyncio.Lock] = None
+_idle_contexts: List[BrowserContext] = []
+_context_slots: Optional[asyncio.Semaphore] = None
+
+
+async def get_browser() -> Browser:
+    """Return the shared browser, launching it on first use"""
+    global _playwright, _browser, _browser_lock
+
+    if _browser_lock is None:
+        _browser_lock = asyncio.Lock()
+
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            if CDP_ENDPOINT:
+                _browser = await _playwright.chromium.connect_over_cdp(
+                    CDP_ENDPOINT)
+            else:
+                _browser = await _playwright.chromium.launch(
+                    headless=True, args=LAUNCH_ARGS, chromium_sandbox=False)
+    return _browser
+
+
+async def close_browser():
+    """Shut down the shared browser (call on app exit)
+
+    A browser reached over CDP is only disconnected from, not stopped.
+    """
+    global _playwright, _browser, _browser_lock, _context_slots
+
+    _idle_contexts.clear()
+    if _browser is not None:
+        await _browser.close()
+        _browser = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
+    # Both are bound to the loop that created them
+    _browser_lock = None
+    _context_slots = None
+
+
+async def _block_heavy_requests(route: Route):
+    request = route.request
+    host = urlsplit(request.url).hostname or ""
+    if (request.resource_type in BLOCKED_RESOURCE_TYPES
+            or host.endswith(BLOCKED_HOSTS)):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def new_context(browser: Browser) -> BrowserContext:
+    """New context on `browser` with heavy resources blocked"""
+    context = await browser.new_context()
+    await context.route("**/*", _block_heavy_requests)
+    return context
+
+
+@asynccontextmanager
+async def acquire_context():
+    """Borrow a context from the pool; cookies are cleared on return"""
+    global _context_slots
+
+    if _context_slots is None:
+        _context_slots = asyncio.Semaphore(CONTEXT_POOL_SIZE)
+
+    async with _context_slots:
+        browser = await get_browser()
+        context = None
+        while _idle_contexts:
+            candidate = _idle_contexts.pop()
+            # Contexts left over from a browser that has since been relaunched
+            if candidate.browser is browser:
+                context = candidate
+                break
+        if context is None:
+            context = await new_context(browser)
+
+        try:
+            yield context
+        finally:
+            try:
+                await context.clear_cookies()
+            except Exception:
+                pass  # context is gone, don't hand it out again
+            else:
+                _idle_contexts.append(context)
+
+
+@asynccontextmanager
+async def new_page():
+    """Open a page in a pooled context on the shared browser"""
+    async with acquire_context() as context:
+        page = await context.new_page()
+        try:
+            yield page
+        finally:
+            await page.close()
@@ -0,0 +1,75 @@
+"""Redis cache for store search results (product name -> product URL)"""
+
+import hashlib
+import logging
+import os
+from typing import Optional, Tuple
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Product URLs are stable for days; "not found" is retried sooner
+SEARCH_TTL = 86400
+SEARCH_MISS_TTL = 3600
+
+# Stored for searches that found nothing
+_MISS = b""
+
+_REDIS = aioredis.Redis(
+    connection_pool=aioredis.ConnectionPool.from_url(
+        REDIS_URL, max_connections=16))
+
+
+async def close_redis():
+    """Disconnect the search-cache pool (call before the event loop ends)"""
+    await _REDIS.connection_pool.disconnect()
+
+
+def _search_key(store_name: str, product_name: str) -> str:
+    # Fixed-size digest - product_name comes straight from the request
+    key_data = "{0}:{1}".format(store_name, product_name).casefold()
+    return "search:{0}".format(
+        hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest())
+
+
+async def get_search_url(
+        store_name: str, product_name: str) -> Tuple[bool, Optional[str]]:
+    """Return (hit, url); url is None for a cached "not found" """
+    try:
+        value = await _REDIS.get(_search_key(store_name, product_name))
+    except RedisError as e:
+        logger.warning("[SEARCH CACHE] Read error: %s", e)
+        return False, None
+
+    if value is None:
+        return False, None
+    if value == _MISS:
+        return True, None
+    return True, value.decode()
+
+
+async def set_search_url(
+        store_name: str, product_name: str, url: Optional[str]):
+    """Remember a search result, or that the search found nothing"""
+    try:
+        if url:
+            await _REDIS.setex(
+                _search_key(store_name, product_name), SEARCH_TTL, url)
+        else:
+            await _REDIS.setex(
+                _search_key(store_name, product_name), SEARCH_MISS_TTL, _MISS)
+    except RedisError as e:
+        logger.warning("[SEARCH CACHE] Write error: %s", e)
+
+
+async def delete_search_url(store_name: str, product_name: str):
+    """Forget a cached search result (e.g. the product page is gone)"""
+    try:
+        await _REDIS.delete(_search_key(store_name, product_name))
+    except RedisError as e:
+        logger.warning("[SEARCH CACHE] Delete error: %s", e)
@@ -0,0 +1,66 @@
+"""Plain-HTTP fast path for pages that render prices server-side"""
+
+import logging
+from typing import Iterable, Optional
+
+import httpx
+from parsel import Selector
+
+from services.scraper.host_limits import host_slot
+
+
+logger = logging.getLogger(__name__)
+
+# Plain browser UA - some shops serve bot UAs a stripped page
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+LIMITS = httpx.Limits(
+    max_keepalive_connections=32, max_connections=64, keepalive_expiry=60)
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Keep-alive client shared by all fast-path fetches"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            limits=LIMITS,
+            timeout=TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _client
+
+
+async def aclose():
+    """Close the shared client (call on shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def try_http(url: str, css_selectors: Iterable[str]) -> Optional[str]:
+    """Fetch `url` without a browser and return the first selector text
+    that contains a digit, or None if the page needs JavaScript.
+    """
+    try:
+        async with host_slot(url):
+            response = await get_client().get(url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.info("[FAST FETCH] %s: %s", url, e)
+        return None
+
+    page = Selector(text=response.text)
+    for css in css_selectors:
+        for node in page.css(css):
+            text = node.xpath("string()").get()
+            if text and any(c.isdigit() for c in text):
+                return text.strip()
+    return None
@@ -0,0 +1,41 @@
+"""Per-host concurrency limits for everything that hits a shop's site"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Dict
+from urllib.parse import urlsplit
+
+
+# Default max in-flight requests/navigations per host
+HOST_CONCURRENCY = int(os.getenv("HOST_CONCURRENCY", "4"))
+
+# Shops that rate-limit harder than the default, keyed without "www."
+HOST_LIMITS: Dict[str, int] = {
+    # Rate-limits bursts of search/product page loads
+    "zooplus.pl": 2,
+}
+
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def _host_key(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def reset_host_slots():
+    """Forget the semaphores - they are bound to the current event loop"""
+    _host_slots.clear()
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """Hold one of the slots for `url`'s host while the block runs"""
+    host = _host_key(url)
+    slots = _host_slots.get(host)
+    if slots is None:
+        slots = _host_slots[host] = asyncio.Semaphore(
+            HOST_LIMITS.get(host, HOST_CONCURRENCY))
+    async with slots:
+        yield
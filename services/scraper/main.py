@@ -1,29 +1,57 @@
 import asyncio
+import logging
+import os
+from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 
-from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from services.api.db import SessionLocal
 from services.api import models
+from services.scraper.browser_pool import close_browser, new_page
+from services.scraper.cache import close_redis as close_search_cache
+from services.scraper.fast_fetch import aclose as close_http_client, try_http
+from services.scraper.host_limits import host_slot, reset_host_slots
+
+
+logger = logging.getLogger(__name__)
+
+# Max shop_products scraped at once by scrape_all_shop_products_once
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
+
+# Snapshots from a full run are written in batches of up to this many rows...
+SNAPSHOT_BATCH_SIZE = 100
+# ...or at least this often (seconds)
+SNAPSHOT_FLUSH_SECONDS = 2.0
 
 
 async def _fetch_price_from_page(url: str, selector: str) -> Optional[Decimal]:
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        await page.goto(url, timeout=30000)
+    # Context z puli współdzielonej przeglądarki (max CONTEXT_POOL_SIZE naraz)
+    async with new_page() as page:
+        async with host_slot(url):
+            await page.goto(url, timeout=30000, wait_until="domcontentloaded")
 
-        element = await page.query_selector(selector)
+        try:
+            element = await page.wait_for_selector(
+                selector, state="attached", timeout=5000)
+        except PlaywrightTimeoutError:
+            element = None
         if element is None:
-            await browser.close()
-            print(f"[SCRAPER] Brak elementu dla selektora: {selector} ({url})")
+            logger.info("[SCRAPER] Brak elementu dla selektora: %s (%s)",
+                        selector, url)
             return None
 
-        text = await element.inner_text()
-        await browser.close()
+        # textContent, nie innerText - arkusze stylów są blokowane, a tekst
+        # ma być taki sam jak z szybkiej ścieżki HTTP
+        text = await element.text_content() or ""
+
+    return _parse_price(text)
+
 
+def _parse_price(text: str) -> Optional[Decimal]:
     cleaned = (
         text.replace("zł", "")
         .replace("PLN", "")
@@ -34,86 +62,213 @@ async def _fetch_price_from_page(url: str, selector: str) -> Optional[Decimal]:
     numeric_str = "".join(ch for ch in cleaned if ch.isdigit() or ch == ".")
 
     if not numeric_str:
-        print(
-            f"[SCRAPER] Nie udało się wyciągnąć liczby z tekstu ceny: {text!r}")
+        logger.warning(
+            "[SCRAPER] Nie udało się wyciągnąć liczby z tekstu ceny: %r", text)
         return None
 
     try:
         return Decimal(numeric_str)
     except Exception as exc:
-        print(f"[SCRAPER] Błąd parsowania ceny {numeric_str!r}: {exc}")
+        logger.warning("[SCRAPER] Błąd parsowania ceny %r: %s",
+                       numeric_str, exc)
         return None
 
 
-async def scrape_shop_product_once(shop_product_id: int) -> None:
+def _insert_snapshots(rows: List[dict]) -> None:
     db: Session = SessionLocal()
+    try:
+        db.execute(insert(models.PriceSnapshot), rows)
+        db.commit()
+    finally:
+        db.close()
+
 
+async def _flush_snapshots(rows: List[dict]) -> Optional[Exception]:
+    """Write `rows`; a failure is logged and returned, not raised"""
     try:
-        sp = db.query(
-            models.ShopProduct).filter(
-            models.ShopProduct.id == shop_product_id).first()
-        if sp is None:
-            print(f"[SCRAPER] ShopProduct id={shop_product_id} nie istnieje.")
-            return
-
-        if not sp.extraction_config:
-            print(
-                f"[SCRAPER] Brak extraction_config dla ShopProduct id={shop_product_id}")
-            return
-
-        selector = sp.extraction_config.get("selector_price")
-        if not selector:
-            print(
-                f"[SCRAPER] Brak 'selector_price' w extraction_config dla id={shop_product_id}")
-            return
-
-        url = sp.shop_product_url
-        print(
-            f"[SCRAPER] Pobieram cenę: shop_product_id={shop_product_id}, url={url}")
+        await asyncio.to_thread(_insert_snapshots, rows)
+        logger.info("[SCRAPER] Zapisano %d price_snapshots.", len(rows))
+    except Exception as exc:
+        logger.error("[SCRAPER] Błąd zapisu %d price_snapshots: %s",
+                     len(rows), exc)
+        return exc
+    return None
 
-        price = await _fetch_price_from_page(url, selector)
-        if price is None:
-            print(
-                f"[SCRAPER] Nie udało się pobrać ceny dla id={shop_product_id}")
-            return
-
-        snapshot = models.PriceSnapshot(
-            product_id=sp.product_id,
-            shop_id=sp.shop_id,
-            price=price,
-            currency="PLN",
-        )
-        db.add(snapshot)
-        db.commit()
 
-        print(
-            f"[SCRAPER] Zapisano price_snapshot: product_id={sp.product_id}, shop_id={sp.shop_id}, price={price}"
-        )
+async def _snapshot_flusher(queue: asyncio.Queue) -> Optional[Exception]:
+    """Drain snapshot rows from the queue until a None sentinel arrives;
+    returns the first write error, if any
+    """
+    loop = asyncio.get_running_loop()
+    rows: List[dict] = []
+    flush_at: Optional[float] = None
+    error: Optional[Exception] = None
+
+    while True:
+        timeout = None if flush_at is None else max(
+            flush_at - loop.time(), 0)
+        try:
+            row = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        else:
+            if row is None:
+                break
+            rows.append(row)
+            if flush_at is None:
+                flush_at = loop.time() + SNAPSHOT_FLUSH_SECONDS
+
+        if len(rows) >= SNAPSHOT_BATCH_SIZE or (
+                flush_at is not None and loop.time() >= flush_at):
+            error = await _flush_snapshots(rows) or error
+            rows = []
+            flush_at = None
+
+    # Resztka po zakończeniu scrapowania
+    if rows:
+        error = await _flush_snapshots(rows) or error
+    return error
+
+
+def _load_shop_products(ids: List[int]) -> List[models.ShopProduct]:
+    # Jedno zapytanie; sesja zamknięta przed scrapowaniem, żeby nie trzymać
+    # połączenia z puli przez czas ładowania stron
+    db: Session = SessionLocal()
+    try:
+        return db.query(models.ShopProduct).filter(
+            models.ShopProduct.id.in_(ids)).all()
     finally:
         db.close()
 
 
+def _snapshot_row(sp: models.ShopProduct, price: Decimal) -> dict:
+    return {
+        "product_id": sp.product_id,
+        "shop_id": sp.shop_id,
+        "price": price,
+        "currency": "PLN",
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def _scrape_price(sp: models.ShopProduct) -> Optional[Decimal]:
+    if not sp.extraction_config:
+        logger.warning(
+            "[SCRAPER] Brak extraction_config dla ShopProduct id=%s", sp.id)
+        return None
+
+    selector = sp.extraction_config.get("selector_price")
+    if not selector:
+        logger.warning(
+            "[SCRAPER] Brak 'selector_price' w extraction_config dla id=%s",
+            sp.id)
+        return None
+
+    url = sp.shop_product_url
+    logger.info("[SCRAPER] Pobieram cenę: shop_product_id=%s, url=%s",
+                sp.id, url)
+
+    # Najpierw zwykły HTTP - przeglądarka tylko gdy cena renderowana w JS
+    price_text = await try_http(url, (selector,))
+    price = _parse_price(price_text) if price_text else None
+
+    if price is None:
+        price = await _fetch_price_from_page(url, selector)
+    if price is None:
+        logger.warning(
+            "[SCRAPER] Nie udało się pobrać ceny dla id=%s", sp.id)
+    return price
+
+
+async def scrape_shop_product_once(shop_product_id: int) -> None:
+    """Scrape one shop_product and store its snapshot"""
+    shop_products = _load_shop_products([shop_product_id])
+    if not shop_products:
+        logger.warning("[SCRAPER] ShopProduct id=%s nie istnieje.",
+                       shop_product_id)
+        return
+
+    sp = shop_products[0]
+    price = await _scrape_price(sp)
+    if price is None:
+        return
+
+    _insert_snapshots([_snapshot_row(sp, price)])
+    logger.info(
+        "[SCRAPER] Zapisano price_snapshot: product_id=%s, shop_id=%s, price=%s",
+        sp.product_id, sp.shop_id, price)
+
+
 async def scrape_all_shop_products_once() -> None:
     db: Session = SessionLocal()
     try:
-        all_sp = db.query(
-            models.ShopProduct).order_by(
-            models.ShopProduct.id).all()
-        ids = [sp.id for sp in all_sp]
+        # Same id, bez ładowania całych obiektów ShopProduct
+        ids = [
+            sp_id for (sp_id,) in db.query(
+                models.ShopProduct.id).order_by(
+                models.ShopProduct.id)]
     finally:
         db.close()
 
-    print(f"[SCRAPER] Znaleziono {len(ids)} wpisów w shop_products.")
+    logger.info("[SCRAPER] Znaleziono %d wpisów w shop_products.", len(ids))
 
-    for sp_id in ids:
-        try:
-            await scrape_shop_product_once(sp_id)
-        except Exception as exc:
-            print(
-                f"[SCRAPER] Błąd przy scrapowaniu shop_product_id={sp_id}: {exc}")
+    try:
+        # Pełny przebieg: błąd zapisu tylko logowany, reszta idzie dalej
+        await scrape_shop_products(ids, raise_write_errors=False)
+    finally:
+        await close_clients()
+
+
+async def close_clients() -> None:
+    """Close the loop-bound browser, HTTP and Redis clients"""
+    await close_browser()
+    await close_http_client()
+    await close_search_cache()
+    reset_host_slots()
+
+
+async def scrape_shop_products(
+        ids: List[int], raise_write_errors: bool = True) -> None:
+    """Scrape a batch of shop_products on the shared browser, writing
+    snapshots in bulk. A failed snapshot write is raised after the final
+    flush (so a Celery task can retry) unless `raise_write_errors` is off.
+    """
+    shop_products = await asyncio.to_thread(_load_shop_products, ids)
+    if len(shop_products) < len(ids):
+        logger.warning("[SCRAPER] %d z %d ShopProduct nie istnieje.",
+                       len(ids) - len(shop_products), len(ids))
+
+    semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+
+    snapshots: asyncio.Queue = asyncio.Queue()
+
+    async def _scrape(sp: models.ShopProduct) -> None:
+        async with semaphore:
+            try:
+                # Przeglądarka uruchamiana dopiero, gdy HTTP nie wystarczy
+                price = await _scrape_price(sp)
+            except Exception as exc:
+                logger.warning(
+                    "[SCRAPER] Błąd przy scrapowaniu shop_product_id=%s: %s",
+                    sp.id, exc)
+                return
+        if price is not None:
+            await snapshots.put(_snapshot_row(sp, price))
+
+    # Max SCRAPE_CONCURRENCY stron naraz
+    flusher = asyncio.create_task(_snapshot_flusher(snapshots))
+    try:
+        await asyncio.gather(*(_scrape(sp) for sp in shop_products))
+    finally:
+        await snapshots.put(None)
+        write_error = await flusher
+
+    if write_error is not None and raise_write_errors:
+        raise write_error
 
 
 def main():
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
     asyncio.run(scrape_all_shop_products_once())
 
 
@@ -1,253 +1,238 @@
 """Real Store Scrapers"""
 
-from typing import Optional, Dict
-from playwright.async_api import async_playwright
+import logging
+from dataclasses import dataclass
+from typing import Optional, Dict, Tuple
 import re
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
 
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 
-class StoreScraperBase:
-    """Base class for store scrapers"""
+from services.scraper.browser_pool import new_page
+from services.scraper.cache import (
+    delete_search_url, get_search_url, set_search_url)
+from services.scraper.fast_fetch import try_http
+from services.scraper.host_limits import host_slot
 
-    def __init__(self, store_name: str):
-        self.store_name = store_name
 
-    async def scrape_price(self, url: str) -> Optional[Dict]:
-        """Scrape price from store"""
-        raise NotImplementedError("Subclasses must implement scrape_price")
-
-    def _extract_price_from_text(self, text: str) -> Optional[Decimal]:
-        """Extract price from text like '189,99 zł' or '189.99'"""
-        if not text:
-            return None
-
-        cleaned = re.sub(r'[^\d,.]', '', text)
-        cleaned = cleaned.replace(',', '.')
-        match = re.search(r'\d+\.?\d*', cleaned)
-        if match:
-            try:
-                return Decimal(match.group())
-            except Exception:
-                return None
-        return None
+logger = logging.getLogger(__name__)
 
-
-class ZooplusScraper(StoreScraperBase):
-    """Scraper for Zooplus.pl"""
-
-    def __init__(self):
-        super().__init__("Zooplus")
-        self.base_url = "https://www.zooplus.pl"
+# Selector fallback chains run in-page - one round-trip instead of several
+# per selector
+_FIRST_TEXT_JS = """(sels) => {
+    for (const s of sels) {
+        const e = document.querySelector(s);
+        if (e && /\\d/.test(e.textContent)) return e.textContent;
+    }
+    return null;
+}"""
+_FIRST_HREF_JS = """(sels) => {
+    for (const s of sels) {
+        const e = document.querySelector(s);
+        if (e && e.getAttribute('href')) return e.href;
+    }
+    return null;
+}"""
+
+# First number in the text, allowing "1 299,99"-style thousand groups
+_PRICE_RE = re.compile(r'\d(?:[\d\s]*\d)?(?:[.,]\d+)?')
+
+
+@dataclass(frozen=True)
+class StoreConfig:
+    """Everything that differs between supported stores"""
+    name: str
+    base_url: str
+    search_path: str
+    search_param: str
+    # Tried in order on the search results page / the product page
+    result_selectors: Tuple[str, ...]
+    price_selectors: Tuple[str, ...]
+    # Price is in the HTML response, so a browser is only a fallback
+    server_rendered: bool = False
+
+
+STORE_CONFIGS = {
+    "zooplus": StoreConfig(
+        name="Zooplus",
+        base_url="https://www.zooplus.pl",
+        search_path="/search",
+        search_param="query",
+        result_selectors=(
+            'a.product-link',
+            'a[data-zta="product_link"]',
+            'article a[href*="/shop/"]',
+            '.product-item a',
+        ),
+        price_selectors=(
+            '[data-zta="productPrice"]',
+            '.price-main',
+            '.product-price',
+            '[class*="price"]',
+        ),
+    ),
+    "kakadu": StoreConfig(
+        name="Kakadu",
+        base_url="https://www.kakadu.pl",
+        search_path="/szukaj",
+        search_param="q",
+        result_selectors=(
+            '.product-item a',
+            'article a[href*="/produkt/"]',
+            '.product-link',
+        ),
+        price_selectors=(
+            '.product-price',
+            '[class*="price"]',
+            '.price-value',
+        ),
+        server_rendered=True,
+    ),
+}
+
+
+class StoreScraper:
+    """Config-driven scraper; the public methods run in a pooled page"""
+
+    def __init__(self, config: StoreConfig):
+        self.config = config
+        self.store_name = config.name
 
     async def search_product(self, product_name: str) -> Optional[str]:
         """Search for product and return first result URL"""
-        search_query = product_name.replace(' ', '+')
-        search_url = "{0}/search?query={1}".format(
-            self.base_url, search_query)
+        hit, url = await get_search_url(self.store_name, product_name)
+        if hit:
+            return url
 
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-
-                await page.goto(search_url, timeout=30000)
-                await page.wait_for_timeout(2000)
-
-                selectors = [
-                    'a.product-link',
-                    'a[data-zta="product_link"]',
-                    'article a[href*="/shop/"]',
-                    '.product-item a',
-                ]
-
-                for selector in selectors:
-                    try:
-                        first_link = await page.locator(selector).first
-                        if await first_link.count() > 0:
-                            href = await first_link.get_attribute('href')
-                            if href:
-                                if href.startswith('http'):
-                                    product_url = href
-                                else:
-                                    product_url = "{0}{1}".format(
-                                        self.base_url, href)
-
-                                await browser.close()
-                                print("[{0}] Found: {1}".format(
-                                    self.store_name, product_url))
-                                return product_url
-                    except Exception:
-                        continue
-
-                await browser.close()
-                print("[{0}] No product found for: {1}".format(
-                    self.store_name, product_name))
-                return None
-
+            async with new_page() as page:
+                return await self._find_product(page, product_name)
         except Exception as e:
-            print("[{0}] Search error: {1}".format(self.store_name, e))
+            logger.warning("[%s] Search error: %s", self.store_name, e)
             return None
 
     async def scrape_price(self, url: str) -> Optional[Dict]:
-        """Scrape price from Zooplus product page"""
-        print("[{0}] Scraping: {1}".format(self.store_name, url))
+        """Scrape price from store"""
+        logger.info("[%s] Scraping: %s", self.store_name, url)
 
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-
-                await page.goto(url, timeout=30000)
-                await page.wait_for_timeout(2000)
-
-                price_selectors = [
-                    '[data-zta="productPrice"]',
-                    '.price-main',
-                    '.product-price',
-                    '[class*="price"]',
-                ]
-
-                price_text = None
-                for selector in price_selectors:
-                    try:
-                        element = await page.locator(selector).first
-                        if await element.count() > 0:
-                            price_text = await element.text_content()
-                            if price_text and any(
-                                    c.isdigit() for c in price_text):
-                                break
-                    except Exception:
-                        continue
-
-                await browser.close()
-
-                if price_text:
-                    price = self._extract_price_from_text(price_text)
-                    if price:
-                        print("[{0}] Found price: {1} PLN".format(
-                            self.store_name, price))
-                        return {
-                            "price": price,
-                            "currency": "PLN",
-                            "available": True,
-                            "url": url
-                        }
-
-                print("[{0}] Could not extract price".format(
-                    self.store_name))
-                return None
+        if self.config.server_rendered:
+            price = self._extract_price_from_text(
+                await try_http(url, self.config.price_selectors))
+            if price:
+                return self._price_result(price, url)
 
+        try:
+            async with new_page() as page:
+                return await self._read_price(page, url)
         except Exception as e:
-            print("[{0}] Error: {1}".format(self.store_name, e))
+            logger.warning("[%s] Error: %s", self.store_name, e)
             return None
 
-
-class KakaduScraper(StoreScraperBase):
-    """Scraper for Kakadu.pl"""
-
-    def __init__(self):
-        super().__init__("Kakadu")
-        self.base_url = "https://www.kakadu.pl"
-
-    async def search_product(self, product_name: str) -> Optional[str]:
-        """Search for product on Kakadu"""
-        search_query = product_name.replace(' ', '+')
-        search_url = "{0}/szukaj?q={1}".format(self.base_url, search_query)
+    async def search_and_scrape(self, product_name: str) -> Optional[Dict]:
+        """Search and scrape the first result in a single page session"""
+        # Known product URL - skip the search page entirely
+        hit, url = await get_search_url(self.store_name, product_name)
+        if hit:
+            if not url:
+                return None
+            result = await self.scrape_price(url)
+            if result is None:
+                # Product moved or removed - search again next time
+                await delete_search_url(self.store_name, product_name)
+            return result
 
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-
-                await page.goto(search_url, timeout=30000)
-                await page.wait_for_timeout(2000)
-
-                selectors = [
-                    '.product-item a',
-                    'article a[href*="/produkt/"]',
-                    '.product-link',
-                ]
-
-                for selector in selectors:
-                    try:
-                        first_link = await page.locator(selector).first
-                        if await first_link.count() > 0:
-                            href = await first_link.get_attribute('href')
-                            if href:
-                                if not href.startswith('http'):
-                                    product_url = "{0}{1}".format(
-                                        self.base_url, href)
-                                else:
-                                    product_url = href
-                                await browser.close()
-                                print("[{0}] Found: {1}".format(
-                                    self.store_name, product_url))
-                                return product_url
-                    except Exception:
-                        continue
-
-                await browser.close()
-                return None
+            async with new_page() as page:
+                url = await self._find_product(page, product_name)
+                if not url:
+                    return None
 
+                logger.info("[%s] Scraping: %s", self.store_name, url)
+                return await self._read_price(page, url)
         except Exception as e:
-            print("[{0}] Search error: {1}".format(self.store_name, e))
+            logger.warning("[%s] Error: %s", self.store_name, e)
             return None
 
-    async def scrape_price(self, url: str) -> Optional[Dict]:
-        """Scrape price from Kakadu"""
-        print("[{0}] Scraping: {1}".format(self.store_name, url))
+    async def _find_product(self, page: Page, product_name: str) -> Optional[str]:
+        """Search on `page`, cache and return the first result URL"""
+        config = self.config
+        search_url = "{0}{1}?{2}".format(
+            config.base_url, config.search_path,
+            urlencode({config.search_param: product_name}))
+
+        async with host_slot(search_url):
+            await page.goto(search_url, timeout=30000,
+                            wait_until="domcontentloaded")
+        rendered = await self._wait_for_any(page, config.result_selectors)
+
+        product_url = await page.evaluate(
+            _FIRST_HREF_JS, list(config.result_selectors))
+        if product_url:
+            logger.info("[%s] Found: %s", self.store_name, product_url)
+        else:
+            logger.info("[%s] No product found for: %s",
+                        self.store_name, product_name)
+        # A miss is only cached when the results list actually rendered
+        if product_url or rendered:
+            await set_search_url(self.store_name, product_name, product_url)
+        return product_url
+
+    async def _read_price(self, page: Page, url: str) -> Optional[Dict]:
+        """Open `url` on `page` and extract the price"""
+        selectors = self.config.price_selectors
+
+        async with host_slot(url):
+            await page.goto(url, timeout=30000,
+                            wait_until="domcontentloaded")
+        await self._wait_for_any(page, selectors)
+
+        price = self._extract_price_from_text(
+            await page.evaluate(_FIRST_TEXT_JS, list(selectors)))
+        if price:
+            return self._price_result(price, url)
+
+        logger.info("[%s] Could not extract price", self.store_name)
+        return None
 
+    async def _wait_for_any(self, page: Page, selectors) -> bool:
+        """Wait until any of `selectors` is in the DOM; False on timeout"""
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-
-                await page.goto(url, timeout=30000)
-                await page.wait_for_timeout(2000)
-
-                price_selectors = [
-                    '.product-price',
-                    '[class*="price"]',
-                    '.price-value',
-                ]
-
-                for selector in price_selectors:
-                    try:
-                        element = await page.locator(selector).first
-                        if await element.count() > 0:
-                            price_text = await element.text_content()
-                            if price_text:
-                                price = self._extract_price_from_text(
-                                    price_text)
-                                if price:
-                                    await browser.close()
-                                    print("[{0}] Found price: {1} PLN".format(
-                                        self.store_name, price))
-                                    return {
-                                        "price": price,
-                                        "currency": "PLN",
-                                        "available": True,
-                                        "url": url
-                                    }
-                    except Exception:
-                        continue
-
-                await browser.close()
-                return None
+            await page.wait_for_selector(
+                ", ".join(selectors), state="attached", timeout=5000)
+        except PlaywrightTimeoutError:
+            logger.info("[%s] Page did not render in time: %s",
+                        self.store_name, page.url)
+            return False
+        return True
+
+    def _price_result(self, price: Decimal, url: str) -> Dict:
+        logger.info("[%s] Found price: %s PLN", self.store_name, price)
+        return {
+            "price": price,
+            "currency": "PLN",
+            "available": True,
+            "url": url
+        }
 
-        except Exception as e:
-            print("[{0}] Error: {1}".format(self.store_name, e))
+    def _extract_price_from_text(self, text: str) -> Optional[Decimal]:
+        """Extract price from text like '189,99 zł' or '189.99'"""
+        if not text:
             return None
 
+        match = _PRICE_RE.search(text)
+        if not match:
+            return None
+        number = "".join(match.group().split()).replace(',', '.')
+        try:
+            return Decimal(number)
+        except InvalidOperation:
+            return None
 
-def get_scraper(store_name: str) -> Optional[StoreScraperBase]:
-    """Get scraper instance by store name"""
-    scrapers = {
-        "zooplus": ZooplusScraper,
-        "kakadu": KakaduScraper,
-    }
 
-    scraper_class = scrapers.get(store_name.lower())
-    if scraper_class:
-        return scraper_class()
+def get_scraper(store_name: str) -> Optional[StoreScraper]:
+    """Get scraper instance by store name"""
+    config = STORE_CONFIGS.get(store_name.lower())
+    if config:
+        return StoreScraper(config)
     return None
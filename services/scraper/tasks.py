@@ -1,16 +1,80 @@
 import asyncio
-from celery import shared_task
+import os
+import threading
+from typing import Optional
+
+from celery import group, shared_task
+from celery.signals import worker_process_init, worker_process_shutdown
 from services.api.db import SessionLocal
 from services.api import models
 
-from services.scraper.main import scrape_shop_product_once  # async
+from services.scraper.main import (  # async
+    close_clients,
+    scrape_shop_product_once,
+    scrape_shop_products,
+)
+
+
+# shop_products per scrape_shop_product_batch task
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", "20"))
+
+# Jedna pętla na proces workera - przeglądarka, HTTP i Redis zostają ciepłe
+# między taskami
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+@worker_process_init.connect
+def _start_loop(**_):
+    global _LOOP
+    _LOOP = asyncio.new_event_loop()
+    threading.Thread(
+        target=_LOOP.run_forever, name="scraper-loop", daemon=True).start()
+
+
+@worker_process_shutdown.connect
+def _stop_loop(**_):
+    global _LOOP
+    if _LOOP is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(close_clients(), _LOOP).result(30)
+    finally:
+        _LOOP.call_soon_threadsafe(_LOOP.stop)
+        _LOOP = None
+
+
+async def _run_and_close(coro):
+    try:
+        return await coro
+    finally:
+        await close_clients()
+
+
+def _run(coro):
+    """Run a coroutine on the worker loop (own loop if there is none)"""
+    if _LOOP is None:
+        # Np. pula solo / tryb eager - bez worker_process_init
+        return asyncio.run(_run_and_close(coro))
+    return asyncio.run_coroutine_threadsafe(coro, _LOOP).result()
 
 
 @shared_task(name="services.scraper.tasks.scrape_shop_product",
              bind=True, acks_late=True, max_retries=3, default_retry_delay=60)
 def scrape_shop_product(self, shop_product_id: int):
     try:
-        asyncio.run(scrape_shop_product_once(shop_product_id))
+        _run(scrape_shop_product_once(shop_product_id))
+    except Exception as exc:
+        try:
+            raise self.retry(exc=exc)
+        except self.MaxRetriesExceededError:
+            raise
+
+
+@shared_task(name="services.scraper.tasks.scrape_shop_product_batch",
+             bind=True, acks_late=True, max_retries=3, default_retry_delay=60)
+def scrape_shop_product_batch(self, shop_product_ids: list):
+    try:
+        _run(scrape_shop_products(shop_product_ids))
     except Exception as exc:
         try:
             raise self.retry(exc=exc)
@@ -18,16 +82,27 @@ def scrape_shop_product(self, shop_product_id: int):
             raise
 
 
+def _iter_id_batches(db, size: int):
+    """Stream shop_product ids from a server-side cursor in lists of `size`"""
+    batch = []
+    query = db.query(models.ShopProduct.id).order_by(models.ShopProduct.id)
+    for (sp_id,) in query.yield_per(1000):
+        batch.append(sp_id)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 @shared_task(name="services.scraper.tasks.scrape_all")
 def scrape_all():
     db = SessionLocal()
     try:
-        ids = [
-            sp.id for sp in db.query(
-                models.ShopProduct).order_by(
-                models.ShopProduct.id).all()]
+        # Paczki wysyłane w trakcie strumieniowania id z bazy
+        group(
+            scrape_shop_product_batch.s(batch)
+            for batch in _iter_id_batches(db, SCRAPE_BATCH_SIZE)
+        ).apply_async()
     finally:
         db.close()
-
-    for _id in ids:
-        scrape_shop_product.delay(_id)